@@ -6,59 +6,433 @@ Supports generating multiple db3 files from data subdirectories.
 
 import sqlite3
 import csv
+import hashlib
+import io
+import math
 import os
+import re
 import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+from itertools import chain, islice
 from pathlib import Path
 
-def create_database(db_path: str, schema_path: Path):
-    """Create database from schema file."""
-    conn = sqlite3.connect(db_path)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    ARROW_ERRORS = (pa.ArrowInvalid,)
+except ImportError:  # Optional: speeds up CSV parsing
+    pa = None
+    pa_csv = None
+    ARROW_ERRORS = ()
+
+# One "key=value" or "key: value" line of a .config file. Comment lines
+# are skipped; a line is split at its first '=', or at its first ':' when
+# it has no '='. Surrounding whitespace is excluded from key and value.
+CONFIG_LINE_RE = re.compile(r"""
+    ^(?![^\S\n]*\#)[^\S\n]*
+    (?:
+        (?P<key>[^=\n]*?)[^\S\n]*=
+      | (?P<colon_key>[^=:\n]*?)[^\S\n]*:
+    )
+    [^\S\n]*(?P<value>.*?)[^\S\n]*$
+""", re.MULTILINE | re.VERBOSE)
+
+# Schema statements that are deferred until after the bulk load. UNIQUE
+# indexes are not deferred: they decide how INSERT OR REPLACE and upserts
+# treat duplicate rows, so they must exist while the data is loaded.
+CREATE_INDEX_RE = re.compile(
+    r"(?:\s+|--[^\n]*|/\*.*?\*/)*CREATE\s+INDEX\b",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Transaction control statements of .sql files (BEGIN/COMMIT/END/ROLLBACK,
+# but not ROLLBACK TO a savepoint). The build already runs in a transaction,
+# so execute_sql_script maps them to a savepoint.
+TRANSACTION_RE = re.compile(
+    r"(?:\s+|--[^\n]*|/\*.*?\*/)*"
+    r"(?P<verb>BEGIN|COMMIT|END|ROLLBACK(?!\s+(?:TRANSACTION\s+)?TO\b))\b",
+    re.IGNORECASE | re.DOTALL
+)
+SCRIPT_TRANSACTION_STATEMENTS = {
+    "BEGIN": ("SAVEPOINT sql_script",),
+    "COMMIT": ("RELEASE sql_script",),
+    "END": ("RELEASE sql_script",),
+    "ROLLBACK": ("ROLLBACK TO sql_script", "RELEASE sql_script"),
+}
+
+# Number of CSV rows bound per executemany call
+CSV_BATCH_SIZE = 10000
+
+# CSV rows inspected to choose INTEGER/REAL/TEXT column types
+TYPE_SAMPLE_ROWS = 1000
+
+# CSV files with at most this many rows use multi-row INSERT statements
+SMALL_TABLE_ROWS = 500
+
+# Entries that mark a data/ subdirectory as a database target
+TARGET_MARKERS = frozenset({"tables", "files", "schema.sql"})
+
+# Prepared statements kept per connection (sqlite3 default: 128)
+STATEMENT_CACHE_SIZE = 256
+
+# VACUUM after an update only when free pages exceed this fraction of the
+# file; fewer are reused by the next build instead of rewriting every blob
+VACUUM_FREE_FRACTION = 0.25
+
+# Chunk size used when streaming files into BLOB columns
+BLOB_CHUNK_SIZE = 1 << 20
+
+# Bulk-load settings for the build connection. Durability is not needed:
+# the db3 file is regenerated from data/ (use --force after a crash).
+# page_size must be set before the first table is created.
+BUILD_PRAGMAS = (
+    "PRAGMA page_size=32768",
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA locking_mode=EXCLUSIVE",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA mmap_size=268435456",
+)
+
+def create_database(db_path: str, schema_path: Path, keep_tables=()):
+    """Create database from schema file.
+    
+    If db_path already exists, every object except the file tables named in
+    keep_tables is dropped first, so the schema and data are reloaded while
+    unchanged file blobs stay in place.
+    
+    Non-unique CREATE INDEX statements of the schema are not executed; they
+    are returned so build_database can create them after the bulk load.
+    Foreign key enforcement is switched off for the load, even if the
+    schema enables it.
+    
+    Returns (conn, deferred_indexes). The connection is in autocommit mode
+    with the build transaction already opened by BEGIN: the drops and the
+    schema are undone together with the load if build_database rolls back,
+    so a failed update leaves the previous database intact.
+    """
+    conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE)
+    conn.isolation_level = None
     cursor = conn.cursor()
+    deferred_indexes = []
     
-    # Read and execute schema if exists
-    if schema_path.exists():
-        with open(schema_path, 'r', encoding='utf-8') as f:
-            schema = f.read()
-            cursor.executescript(schema)
+    try:
+        for pragma in BUILD_PRAGMAS:
+            cursor.execute(pragma)
+        # Has no effect inside a transaction, so a schema enabling it is ignored
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        
+        cursor.execute("BEGIN")
+        clear_database(cursor, keep_tables)
+        
+        # Read and execute schema if exists
+        if schema_path.exists():
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                schema = f.read()
+            
+            statements = []
+            for statement in iter_sql_statements(schema):
+                if CREATE_INDEX_RE.match(statement):
+                    deferred_indexes.append(statement)
+                else:
+                    statements.append(statement)
+            # Not executescript(), which would commit the transaction
+            execute_sql_script(cursor, "\n".join(statements))
+    except Exception:
+        conn.close()
+        raise
 
-    conn.commit()
-    return conn
+    return conn, deferred_indexes
 
-def load_csv_data(conn: sqlite3.Connection, csv_path: Path, table_name: str = None):
-    """Load data from CSV file into table."""
-    cursor = conn.cursor()
+def finish_database(cursor: sqlite3.Cursor, deferred_indexes: list):
+    """Create the deferred schema indexes and analyze the loaded data.
     
+    Also reports rows violating foreign keys, since they were not enforced
+    during the load. The statistics are stored in the db3 file, so readers
+    get good query plans without running ANALYZE themselves.
+    """
+    for statement in deferred_indexes:
+        try:
+            cursor.execute(statement)
+        except sqlite3.Error as e:
+            # A schema index that cannot be created fails the whole build
+            raise sqlite3.Error(f"Error creating index from schema.sql: {e}") from e
+    if deferred_indexes:
+        print(f"  ✓ Created {len(deferred_indexes)} index(es) from schema.sql")
+    
+    cursor.execute("PRAGMA foreign_key_check")
+    violations = cursor.fetchall()
+    if violations:
+        tables = sorted({row[0] for row in violations})
+        print(f"  ⚠ {len(violations)} foreign key violation(s) in: {', '.join(tables)}")
+    
+    cursor.execute("PRAGMA analysis_limit=1000")
+    cursor.execute("ANALYZE")
+
+def clear_database(cursor: sqlite3.Cursor, keep_tables=()):
+    """Drop all tables, views, triggers and indexes except keep_tables.
+    
+    A table in keep_tables is only kept if it has the code and sha256
+    columns of a file table (databases built before sha256 was added are
+    reloaded). Indexes and triggers of kept tables are dropped as well, so
+    re-running the schema does not conflict with them.
+    """
+    kept = set()
+    for table in keep_tables:
+        cursor.execute(f'PRAGMA table_info("{table}")')
+        columns = {col[1].lower() for col in cursor.fetchall()}
+        if {'code', 'file_blob', 'sha256'} <= columns:
+            kept.add(table)
+    keep_tables = kept
+    
+    cursor.execute(
+        "SELECT type, name, tbl_name FROM sqlite_master "
+        "WHERE type IN ('table', 'view', 'trigger', 'index') "
+        "AND name NOT LIKE 'sqlite_%' AND sql IS NOT NULL"
+    )
+    objects = cursor.fetchall()
+    
+    # Drop dependents before the tables they belong to
+    order = {'trigger': 0, 'view': 1, 'index': 2, 'table': 3}
+    for obj_type, name, tbl_name in sorted(objects, key=lambda obj: order[obj[0]]):
+        if obj_type == 'table' and name in keep_tables:
+            continue
+        if obj_type in ('trigger', 'index') and tbl_name not in keep_tables:
+            continue  # Dropped together with their table
+        cursor.execute(f'DROP {obj_type.upper()} IF EXISTS "{name}"')
+
+def load_csv_data(cursor: sqlite3.Cursor, csv_path: Path, table_name: str = None):
+    """Load data from CSV file into table.
+    
+    Rows are streamed through executemany in chunks of CSV_BATCH_SIZE so the
+    INSERT statement is parsed once and memory stays bounded for large files.
+    Files with at most SMALL_TABLE_ROWS rows are inserted with multi-row
+    VALUES statements instead. The file is parsed with pyarrow when it is
+    installed.
+    
+    New tables get INTEGER/REAL columns where the first TYPE_SAMPLE_ROWS
+    rows allow it (see _infer_column_types). If a later value would not
+    round-trip through the chosen type, the table is reloaded with TEXT
+    columns only. A <table>.pk file next to the CSV lists primary key
+    columns; the table is then created WITHOUT ROWID.
+    """
     # If table_name not provided, use filename without extension
     if table_name is None:
         table_name = csv_path.stem
     
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        columns = reader.fieldnames
+    infer_types = True
+    use_arrow = pa_csv is not None
+    while True:
+        try:
+            with savepoint(cursor, "csv_load"):
+                _load_csv_file(cursor, csv_path, table_name, infer_types, use_arrow)
+            return
+        except ColumnTypeError:
+            infer_types = False
+        except ARROW_ERRORS:
+            # pyarrow rejected a later block (e.g. a ragged row); use the csv module
+            use_arrow = False
+
+def _load_csv_file(cursor: sqlite3.Cursor, csv_path: Path, table_name: str,
+                   infer_types: bool, use_arrow: bool):
+    """Create the table for a CSV file (if needed) and insert its rows."""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        columns = next(reader, None)
         
         if columns:
+            # Prefer pyarrow's C parser; fall back to the csv module
+            rows = _read_csv_arrow(csv_path, columns) if use_arrow else None
+            if rows is None:
+                rows = _iter_csv_rows(reader, len(columns))
+            
+            # Pick column types for new tables from a sample of the rows
+            column_types = ['TEXT'] * len(columns)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+            if infer_types and cursor.fetchone() is None:
+                sample = list(islice(rows, TYPE_SAMPLE_ROWS))
+                column_types = _infer_column_types(sample, len(columns))
+                rows = chain(sample, rows)
+            
             # Create table if not exists
             create_table_sql = f"CREATE TABLE IF NOT EXISTS {table_name} ("
-            placeholders = []
-            for col in columns:
-                create_table_sql += f"{col} TEXT, "
-            create_table_sql = create_table_sql.rstrip(", ") + ")"
+            for col, col_type in zip(columns, column_types):
+                create_table_sql += f"{col} {col_type}, "
+            primary_key = load_primary_key(csv_path.with_suffix('.pk'))
+            if primary_key:
+                create_table_sql += f"PRIMARY KEY ({', '.join(primary_key)})) WITHOUT ROWID"
+            else:
+                create_table_sql = create_table_sql.rstrip(", ") + ")"
             cursor.execute(create_table_sql)
             
             placeholders = ', '.join(['?' for _ in columns])
             columns_str = ', '.join(columns)
+            insert_prefix = f"INSERT OR REPLACE INTO {table_name} ({columns_str}) VALUES "
+            row_values = f"({placeholders})"
+            insert_sql = insert_prefix + row_values
+            
+            if any(col_type != 'TEXT' for col_type in column_types):
+                rows = _coerce_rows(rows, column_types)
             
-            for row in reader:
-                values = [row[col] for col in columns]
-                cursor.execute(
-                    f"INSERT OR REPLACE INTO {table_name} ({columns_str}) VALUES ({placeholders})",
-                    values
-                )
+            # Small tables are inserted with multi-row VALUES statements
+            batch = list(islice(rows, SMALL_TABLE_ROWS + 1))
+            if len(batch) <= SMALL_TABLE_ROWS:
+                _insert_multi_row(cursor, insert_prefix, row_values, batch, len(columns))
+                return
+            
+            while batch:
+                cursor.executemany(insert_sql, batch)
+                batch = list(islice(rows, CSV_BATCH_SIZE))
+
+class ColumnTypeError(ValueError):
+    """A CSV value does not round-trip through its column's inferred type."""
+
+def _to_integer(value):
+    """Convert a CSV value for an INTEGER column; empty values are kept."""
+    if not value:
+        return value
+    try:
+        number = int(value)
+    except ValueError:
+        raise ColumnTypeError(value) from None
+    if str(number) != value:  # e.g. "007", "+1", "1_000"
+        raise ColumnTypeError(value)
+    if not -2**63 <= number < 2**63:  # outside SQLite's 64-bit INTEGER
+        raise ColumnTypeError(value)
+    return number
+
+def _to_real(value):
+    """Convert a CSV value for a REAL column; empty values are kept."""
+    if not value:
+        return value
+    try:
+        number = float(value)
+    except ValueError:
+        raise ColumnTypeError(value) from None
+    if repr(number) != value or not math.isfinite(number):  # e.g. "1.50", "1e3", "nan"
+        raise ColumnTypeError(value)
+    return number
+
+# Column types tried by _infer_column_types, in order of preference
+COLUMN_CONVERTERS = {
+    'INTEGER': _to_integer,
+    'REAL': _to_real,
+}
+
+def _infer_column_types(rows: list, width: int):
+    """Return the SQL type of each column, based on sample rows.
+    
+    A column is INTEGER or REAL only if every non-empty sampled value
+    converts without changing its text form, so CSV exports stay identical.
+    """
+    column_types = []
+    for i in range(width):
+        values = [row[i] for row in rows if row[i]]
+        for col_type, convert in COLUMN_CONVERTERS.items():
+            try:
+                for value in values:
+                    convert(value)
+            except ColumnTypeError:
+                continue
+            if values:
+                column_types.append(col_type)
+                break
+        else:
+            column_types.append('TEXT')
+    return column_types
+
+def _coerce_rows(rows, column_types: list):
+    """Convert the values of typed columns; raises ColumnTypeError on mismatch."""
+    converters = [(i, COLUMN_CONVERTERS[col_type])
+                  for i, col_type in enumerate(column_types) if col_type != 'TEXT']
+    for row in rows:
+        row = list(row)
+        for i, convert in converters:
+            row[i] = convert(row[i])
+        yield row
+
+def load_primary_key(pk_path: Path):
+    """Load primary key column names from a <table>.pk file.
     
-    conn.commit()
+    Column names are separated by commas or newlines; # starts a comment.
+    """
+    if not pk_path.exists():
+        return []
+    
+    columns = []
+    with open(pk_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            columns.extend(c.strip() for c in line.split(',') if c.strip())
+    return columns
 
-def load_config(conn: sqlite3.Connection, config_path: Path):
+def _insert_multi_row(cursor: sqlite3.Cursor, insert_prefix: str, row_values: str, rows: list, width: int):
+    """Insert rows with as few multi-row INSERT ... VALUES statements as possible.
+    
+    Each statement binds at most SQLITE_LIMIT_VARIABLE_NUMBER parameters.
+    """
+    if not rows:
+        return
+    
+    if hasattr(cursor.connection, "getlimit"):
+        max_variables = cursor.connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    else:
+        max_variables = 999  # SQLite default before 3.32
+    rows_per_statement = max(1, min(len(rows), max_variables // width))
+    
+    for start in range(0, len(rows), rows_per_statement):
+        chunk = rows[start:start + rows_per_statement]
+        sql = insert_prefix + ", ".join([row_values] * len(chunk))
+        cursor.execute(sql, [value for row in chunk for value in row])
+
+def _read_csv_arrow(csv_path: Path, columns: list):
+    """Stream a CSV file through pyarrow and return an iterator of row tuples.
+    
+    All columns are read as strings so values match what csv.reader
+    produces. The file is decoded block by block, and only one record batch
+    is converted to Python values at a time. Returns None when the header
+    does not parse cleanly; errors in later blocks (e.g. ragged rows) are
+    raised as pyarrow.ArrowInvalid while iterating.
+    """
+    try:
+        reader = pa_csv.open_csv(
+            csv_path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={col: pa.string() for col in columns}
+            )
+        )
+    except pa.ArrowInvalid:
+        return None
+    
+    if reader.schema.names != columns:
+        return None
+    
+    return _iter_arrow_rows(reader)
+
+def _iter_arrow_rows(reader):
+    """Yield row tuples from a pyarrow CSV reader, one record batch at a time."""
+    for batch in reader:
+        yield from zip(*[column.to_pylist() for column in batch.columns])
+
+def _iter_csv_rows(reader, width: int):
+    """Yield CSV rows with exactly `width` values.
+    
+    Well-formed rows are passed through as-is. Like csv.DictReader, blank
+    lines are skipped, missing trailing values become NULL and extra values
+    are dropped.
+    """
+    for row in reader:
+        if len(row) == width:
+            yield row
+        elif row:
+            yield (row + [None] * width)[:width]
+
+def load_config(cursor: sqlite3.Cursor, config_path: Path):
     """Load configuration from .config file into config table.
     
     Config file format (simple key=value or key:value):
@@ -71,8 +445,6 @@ def load_config(conn: sqlite3.Connection, config_path: Path):
     database.name: ZWCAD_Arch.db3
     database.version: 1.0.0
     """
-    cursor = conn.cursor()
-    
     # Ensure config table exists
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS config (
@@ -85,47 +457,70 @@ def load_config(conn: sqlite3.Connection, config_path: Path):
     if not config_path.exists():
         return
     
-    with open(config_path, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            # Strip whitespace and skip empty lines and comments
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # Support both = and : separators
-            if '=' in line:
-                key, value = line.split('=', 1)
-            elif ':' in line:
-                key, value = line.split(':', 1)
-            else:
-                # Skip invalid lines
-                continue
-            
-            key = key.strip()
-            value = value.strip()
-            
-            # Remove quotes if present
-            if (value.startswith('"') and value.endswith('"')) or \
-               (value.startswith("'") and value.endswith("'")):
-                value = value[1:-1]
-            
-            if key and value:
-                cursor.execute(
-                    "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
-                    (key, value)
-                )
-    
-    conn.commit()
+    text = config_path.read_text(encoding='utf-8')
+    pairs = []
+    # Repeated keys/values ("true", versions, ...) share one str object
+    strings = {}
+    for match in CONFIG_LINE_RE.finditer(text):
+        key = match.group('key')
+        if key is None:
+            key = match.group('colon_key')
+        value = _strip_quotes(match.group('value'))
+        if key and value:
+            pairs.append((strings.setdefault(key, key), strings.setdefault(value, value)))
+    
+    cursor.executemany(
+        "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)",
+        pairs
+    )
 
-def load_sql_script(conn: sqlite3.Connection, sql_path: Path):
-    """Execute SQL script file."""
-    cursor = conn.cursor()
-    
-    with open(sql_path, 'r', encoding='utf-8') as f:
-        sql = f.read()
-        cursor.executescript(sql)
+def _strip_quotes(value: str):
+    """Remove matching single or double quotes around a config value."""
+    if value[:1] in ('"', "'") and value.endswith(value[0]):
+        return value[1:-1]
+    return value
+
+def execute_sql_script(cursor: sqlite3.Cursor, sql: str):
+    """Execute an SQL script.
     
-    conn.commit()
+    Statements are executed one by one because executescript() would commit
+    the transaction opened by build_database. The script's own BEGIN,
+    COMMIT/END and ROLLBACK (common in SQL dumps) become a savepoint, its
+    release and a rollback to it.
+    """
+    for statement in iter_sql_statements(sql):
+        match = TRANSACTION_RE.match(statement)
+        if match:
+            for replacement in SCRIPT_TRANSACTION_STATEMENTS[match.group('verb').upper()]:
+                cursor.execute(replacement)
+        else:
+            cursor.execute(statement)
+
+def iter_sql_statements(sql: str):
+    """Split an SQL script into complete statements."""
+    statement = ''
+    for part in sql.split(';'):
+        statement += part + ';'
+        # A ';' inside a string literal or trigger body does not end the statement
+        if sqlite3.complete_statement(statement):
+            if statement.strip(' \t\r\n;'):
+                yield statement
+            statement = ''
+    
+    if statement.strip(' \t\r\n;'):
+        yield statement
+
+@contextmanager
+def savepoint(cursor: sqlite3.Cursor, name: str = "load_step"):
+    """Run a block inside a SAVEPOINT, undoing only its changes on error."""
+    cursor.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except BaseException:
+        cursor.execute(f"ROLLBACK TO {name}")
+        cursor.execute(f"RELEASE {name}")
+        raise
+    cursor.execute(f"RELEASE {name}")
 
 def load_tables_config(config_path: Path):
     """Load table names from tables.config configuration file.
@@ -143,6 +538,8 @@ def load_tables_config(config_path: Path):
     
     try:
         tables = []
+        # Repeated table names share one str object
+        names = {}
         with open(config_path, 'r', encoding='utf-8') as f:
             for line in f:
                 line = line.strip()
@@ -153,10 +550,13 @@ def load_tables_config(config_path: Path):
                 # Support tables= format
                 if line.startswith('tables='):
                     table_list = line.split('=', 1)[1].strip()
-                    tables.extend([t.strip() for t in table_list.split(',') if t.strip()])
+                    for t in table_list.split(','):
+                        t = t.strip()
+                        if t:
+                            tables.append(names.setdefault(t, t))
                 else:
                     # Simple format: one table name per line
-                    tables.append(line)
+                    tables.append(names.setdefault(line, line))
         
         return [t for t in tables if t]  # Remove empty strings
     except Exception as e:
@@ -164,48 +564,139 @@ def load_tables_config(config_path: Path):
     
     return []
 
-def load_files_from_directory(conn: sqlite3.Connection, table_name: str, files_dir: Path):
-    """Load files from a directory into a table with ID, code, file_blob columns."""
-    cursor = conn.cursor()
+def load_files_from_directory(cursor: sqlite3.Cursor, table_name: str, files_dir: Path):
+    """Load files from a directory into a table with ID, code, file_blob, sha256 columns.
     
+    Rows left by a previous build are kept when their code and SHA-256
+    still match the file on disk; changed files are replaced and rows of
+    removed files are deleted. A file table defined by schema.sql without
+    a sha256 column is loaded without hashes, so nothing is skipped.
+    """
     # Create table with ID, code, file_blob structure
     cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS {table_name} (
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             code TEXT NOT NULL,
-            file_blob BLOB NOT NULL
+            file_blob BLOB NOT NULL,
+            sha256 TEXT
         )
     """)
     
     if not files_dir.exists() or not files_dir.is_dir():
         return 0
     
+    cursor.execute(f'PRAGMA table_info("{table_name}")')
+    store_hash = 'sha256' in {col[1].lower() for col in cursor.fetchall()}
+    
+    # Build the INSERT once so every row reuses the cached prepared statement
+    blob_value = "zeroblob(?)" if hasattr(cursor.connection, "blobopen") else "?"
+    if store_hash:
+        insert_sql = f"INSERT INTO {table_name} (code, file_blob, sha256) VALUES (?, {blob_value}, ?)"
+    else:
+        insert_sql = f"INSERT INTO {table_name} (code, file_blob) VALUES (?, {blob_value})"
+    delete_sql = f"DELETE FROM {table_name} WHERE code = ?"
+    
+    # Hashes stored by a previous build (empty for a new database)
+    stored_hashes = {}
+    if store_hash:
+        cursor.execute(f"SELECT code, sha256 FROM {table_name}")
+        stored_hashes = dict(cursor.fetchall())
+    
     file_count = 0
-    # Get all files in the directory (non-recursive)
-    for file_path in files_dir.iterdir():
-        if file_path.is_file():
-            try:
-                # Read file as binary
-                with open(file_path, 'rb') as f:
-                    file_data = f.read()
-                
-                # Get filename (code)
-                code = file_path.name
-                
-                # Insert into table
-                cursor.execute(
-                    f"INSERT INTO {table_name} (code, file_blob) VALUES (?, ?)",
-                    (code, sqlite3.Binary(file_data))
-                )
-                file_count += 1
-            except Exception as e:
-                print(f"    ✗ Error loading file {file_path.name}: {e}")
+    # Get all files in the directory (non-recursive); scandir reports the
+    # entry type without an extra stat per file
+    with os.scandir(files_dir) as it:
+        entries = [entry for entry in it if entry.is_file()]
+    
+    for entry in entries:
+        try:
+            # Get filename (code)
+            code = entry.name
+            
+            if code in stored_hashes:
+                if stored_hashes[code] == file_sha256(entry.path):
+                    file_count += 1
+                    continue
+                cursor.execute(delete_sql, (code,))
+            
+            # Insert into table; a failed copy must not leave a partial row
+            with savepoint(cursor, "load_file"):
+                insert_file_blob(cursor, insert_sql, table_name, code, entry.path,
+                                 entry.stat().st_size, store_hash)
+            file_count += 1
+        except Exception as e:
+            print(f"    ✗ Error loading file {entry.name}: {e}")
+    
+    # Remove rows of files that no longer exist
+    removed = stored_hashes.keys() - {entry.name for entry in entries}
+    cursor.executemany(delete_sql, [(code,) for code in removed])
     
-    conn.commit()
     return file_count
 
-def build_database(target_name: str, project_root: Path, build_dir: Path):
-    """Build a single database from target directory."""
+def file_sha256(file_path):
+    """Return the hex SHA-256 digest of a file."""
+    with open(file_path, 'rb') as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        digest = hashlib.sha256()
+        while chunk := f.read(BLOB_CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+def insert_file_blob(cursor: sqlite3.Cursor, insert_sql: str, table_name: str, code: str,
+                     file_path: Path, size: int = None, store_hash: bool = True):
+    """Insert a file into a file table, streaming its content into the BLOB.
+    
+    A zeroblob of the file size is inserted first and then filled in
+    BLOB_CHUNK_SIZE pieces through incremental blob I/O, so the whole file
+    is never held in memory. The SHA-256 is computed during the copy and
+    stored afterwards. Python < 3.11 lacks Connection.blobopen and falls
+    back to reading the file at once.
+    
+    `insert_sql` takes (code, size, sha256) parameters, or
+    (code, data, sha256) on the fallback path; without store_hash the
+    sha256 parameter is left out. `size` is looked up with stat() when not
+    given.
+    """
+    conn = cursor.connection
+    digest = hashlib.sha256()
+    
+    if not hasattr(conn, "blobopen"):
+        with open(file_path, 'rb') as f:
+            file_data = f.read()
+        params = (code, sqlite3.Binary(file_data))
+        if store_hash:
+            digest.update(file_data)
+            params += (digest.hexdigest(),)
+        cursor.execute(insert_sql, params)
+        return
+    
+    if size is None:
+        size = os.stat(file_path).st_size
+    cursor.execute(insert_sql, (code, size, None) if store_hash else (code, size))
+    rowid = cursor.lastrowid
+    
+    with conn.blobopen(table_name, "file_blob", rowid) as blob, \
+         open(file_path, 'rb') as f:
+        remaining = size
+        while remaining:
+            chunk = f.read(min(BLOB_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise OSError(f"File changed while reading: {code}")
+            blob.write(chunk)
+            digest.update(chunk)
+            remaining -= len(chunk)
+    
+    if store_hash:
+        cursor.execute(f"UPDATE {table_name} SET sha256 = ? WHERE rowid = ?", (digest.hexdigest(), rowid))
+
+def build_database(target_name: str, project_root: Path, build_dir: Path, force: bool = False):
+    """Build a single database from target directory.
+    
+    An existing database is updated in place: everything is reloaded except
+    file tables, whose unchanged files are skipped. With force (or if the
+    existing file cannot be reused) the database is rebuilt from scratch.
+    """
     target_dir = project_root / "data" / target_name
     
     if not target_dir.exists() or not target_dir.is_dir():
@@ -217,8 +708,8 @@ def build_database(target_name: str, project_root: Path, build_dir: Path):
     tables_dir = target_dir / "tables"
     files_dir = target_dir / "files"
     
-    # Remove existing database if present
-    if db_path.exists():
+    # Remove existing database if a full rebuild is requested
+    if force and db_path.exists():
         os.remove(db_path)
     
     print(f"\n{'='*60}")
@@ -226,11 +717,57 @@ def build_database(target_name: str, project_root: Path, build_dir: Path):
     print(f"Output: {db_path}")
     print(f"{'='*60}")
     
-    # Create database from schema
-    conn = create_database(str(db_path), schema_path)
+    # Keep file tables whose directory still exists, to skip unchanged files
+    update_existing = db_path.exists()
+    keep_tables = []
+    if update_existing and files_dir.exists():
+        keep_tables = [t for t in load_tables_config(files_dir / "tables.config")
+                       if (files_dir / t).is_dir()]
+    
+    # Create database from schema; its indexes are created after loading
+    try:
+        conn, deferred_indexes = create_database(str(db_path), schema_path, keep_tables)
+    except sqlite3.Error as e:
+        if not update_existing:
+            raise
+        print(f"  ⚠ Cannot update existing database ({e}), rebuilding from scratch")
+        os.remove(db_path)
+        conn, deferred_indexes = create_database(str(db_path), schema_path)
+    
     if schema_path.exists():
         print("✓ Schema loaded successfully")
     
+    # Load all data in the transaction opened by create_database, through
+    # one shared cursor
+    cursor = conn.cursor()
+    try:
+        load_target_data(cursor, tables_dir, files_dir)
+        finish_database(cursor, deferred_indexes)
+        cursor.execute("COMMIT")
+    except Exception as e:
+        cursor.execute("ROLLBACK")
+        conn.close()
+        print(f"✗ Error building database {target_name}: {e}")
+        return False
+    
+    # Compact pages freed by tables dropped from a previous build
+    cursor.execute("PRAGMA freelist_count")
+    free_pages = cursor.fetchone()[0]
+    cursor.execute("PRAGMA page_count")
+    if free_pages > cursor.fetchone()[0] * VACUUM_FREE_FRACTION:
+        cursor.execute("VACUUM")
+    cursor.execute("PRAGMA optimize")
+    
+    conn.close()
+    print(f"✓ Database built successfully: {db_path}")
+    return True
+
+def load_target_data(cursor: sqlite3.Cursor, tables_dir: Path, files_dir: Path):
+    """Load tables, configs, SQL scripts and file tables of a target.
+    
+    Each step runs in its own savepoint, so a failing file is logged and
+    rolled back without discarding the rest of the build.
+    """
     # Load CSV files from tables directory (only those specified in tables.config)
     if tables_dir.exists():
         tables_config_path = tables_dir / "tables.config"
@@ -242,7 +779,8 @@ def build_database(target_name: str, project_root: Path, build_dir: Path):
                 csv_file = tables_dir / f"{table_name}.csv"
                 if csv_file.exists():
                     try:
-                        load_csv_data(conn, csv_file, table_name)
+                        with savepoint(cursor):
+                            load_csv_data(cursor, csv_file, table_name)
                         print(f"  ✓ Loaded table '{table_name}' from {csv_file.name}")
                     except Exception as e:
                         print(f"  ✗ Error loading table '{table_name}' from {csv_file.name}: {e}")
@@ -256,7 +794,8 @@ def build_database(target_name: str, project_root: Path, build_dir: Path):
                 if csv_file.name.endswith('.config'):
                     continue
                 try:
-                    load_csv_data(conn, csv_file)
+                    with savepoint(cursor):
+                        load_csv_data(cursor, csv_file)
                     print(f"  ✓ Loaded {csv_file.name} (no tables.config found, using all CSV files)")
                 except Exception as e:
                     print(f"  ✗ Error loading {csv_file.name}: {e}")
@@ -269,20 +808,36 @@ def build_database(target_name: str, project_root: Path, build_dir: Path):
             if config_file.name == "tables.config":
                 continue
             try:
-                load_config(conn, config_file)
+                with savepoint(cursor):
+                    load_config(cursor, config_file)
                 print(f"  ✓ Loaded config from {config_file.name}")
             except Exception as e:
                 print(f"  ✗ Error loading {config_file.name}: {e}")
     
-    # Execute SQL scripts (excluding schema.sql)
+    # Execute SQL scripts (excluding schema.sql) as one combined script
     if tables_dir.exists():
         sql_files = [f for f in tables_dir.glob("*.sql") if f.name != "schema.sql"]
+        scripts = []
         for sql_file in sql_files:
             try:
-                load_sql_script(conn, sql_file)
-                print(f"  ✓ Executed {sql_file.name}")
+                scripts.append((sql_file, sql_file.read_text(encoding='utf-8')))
             except Exception as e:
-                print(f"  ✗ Error executing {sql_file.name}: {e}")
+                print(f"  ✗ Error reading {sql_file.name}: {e}")
+        
+        try:
+            with savepoint(cursor):
+                execute_sql_script(cursor, "\n;\n".join(sql for _, sql in scripts))
+            for sql_file, _ in scripts:
+                print(f"  ✓ Executed {sql_file.name}")
+        except Exception:
+            # Re-run the scripts one by one to report and skip the broken ones
+            for sql_file, sql in scripts:
+                try:
+                    with savepoint(cursor):
+                        execute_sql_script(cursor, sql)
+                    print(f"  ✓ Executed {sql_file.name}")
+                except Exception as e:
+                    print(f"  ✗ Error executing {sql_file.name}: {e}")
     
     # Load files from subdirectories into tables with ID, code, file_blob structure
     if files_dir.exists():
@@ -295,7 +850,8 @@ def build_database(target_name: str, project_root: Path, build_dir: Path):
                 table_files_dir = files_dir / table_name
                 if table_files_dir.exists() and table_files_dir.is_dir():
                     try:
-                        file_count = load_files_from_directory(conn, table_name, table_files_dir)
+                        with savepoint(cursor):
+                            file_count = load_files_from_directory(cursor, table_name, table_files_dir)
                         if file_count > 0:
                             print(f"  ✓ Created table '{table_name}' with {file_count} file(s)")
                         else:
@@ -306,10 +862,22 @@ def build_database(target_name: str, project_root: Path, build_dir: Path):
                     print(f"  ⚠ Directory not found for file table '{table_name}': {table_files_dir}")
         else:
             print("  ℹ No files/tables.config found or empty, skipping file tables")
+
+def build_database_captured(target_name: str, project_root: Path, build_dir: Path, force: bool = False):
+    """Build a database in a worker process and return (success, output).
     
-    conn.close()
-    print(f"✓ Database built successfully: {db_path}")
-    return True
+    Output is buffered so logs of targets built in parallel do not interleave.
+    An unexpected exception is reported in the output and counts as a
+    failed build, so the other targets' logs and the summary still print.
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        try:
+            success = build_database(target_name, project_root, build_dir, force)
+        except Exception as e:
+            print(f"✗ Error building database {target_name}: {e}")
+            success = False
+    return success, output.getvalue()
 
 def get_available_targets(project_root: Path):
     """Get list of available database targets from data directory."""
@@ -318,11 +886,15 @@ def get_available_targets(project_root: Path):
         return []
     
     targets = []
-    for item in data_dir.iterdir():
-        if item.is_dir() and not item.name.startswith('.'):
-            # Check if it's a valid target directory (has tables or files subdirectory)
-            if (item / "tables").exists() or (item / "files").exists() or (item / "schema.sql").exists():
-                targets.append(item.name)
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if entry.is_dir() and not entry.name.startswith('.'):
+                # Check if it's a valid target directory (has tables or files
+                # subdirectory); one listing replaces three exists() probes
+                with os.scandir(entry.path) as children:
+                    names = {child.name for child in children}
+                if not TARGET_MARKERS.isdisjoint(names):
+                    targets.append(entry.name)
     
     return sorted(targets)
 
@@ -339,6 +911,12 @@ Examples:
   # Build specific databases
   python scripts/build_db.py ZWCAD_Arch USERCompLib
   
+  # Rebuild from scratch instead of updating existing db3 files
+  python scripts/build_db.py --all --force
+  
+  # Build with at most 2 parallel workers
+  python scripts/build_db.py --all --jobs 2
+  
   # List available targets
   python scripts/build_db.py --list
         """
@@ -359,6 +937,17 @@ Examples:
         action='store_true',
         help='List all available database targets'
     )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of databases to build in parallel (default: CPU count)'
+    )
+    parser.add_argument(
+        '--force', '-f',
+        action='store_true',
+        help='Delete existing db3 files and rebuild them from scratch'
+    )
     
     args = parser.parse_args()
     
@@ -398,11 +987,21 @@ Examples:
     
     # Build databases
     print(f"Building {len(targets_to_build)} database(s)...")
-    success_count = 0
+    jobs = max(1, min(args.jobs, len(targets_to_build)))
     
-    for target in targets_to_build:
-        if build_database(target, project_root, build_dir):
-            success_count += 1
+    if jobs == 1:
+        results = [build_database(target, project_root, build_dir, args.force) for target in targets_to_build]
+    else:
+        # Each target writes its own db3 file, so targets build independently
+        results = []
+        build = partial(build_database_captured, project_root=project_root, build_dir=build_dir,
+                        force=args.force)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for success, output in executor.map(build, targets_to_build):
+                print(output, end='')
+                results.append(success)
+    
+    success_count = sum(results)
     
     print(f"\n{'='*60}")
     print(f"Completed: {success_count}/{len(targets_to_build)} database(s) built successfully")
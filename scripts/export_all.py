@@ -1,13 +1,29 @@
 #!/usr/bin/env python3
 """
 批量导出 build 目录下所有 db3 文件到各自的目录
-直接调用 export_db.py 的命令行功能
+在进程池中直接调用 export_db.export_one，与 export_db.py --file 行为一致
 """
 
-import subprocess
+import io
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 
+# Add parent directory to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.export_db import export_one
+
+def export_captured(db_file: Path):
+    """在工作进程中导出单个 db3 文件，返回 (是否成功, 输出内容)"""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        success = export_one(str(db_file))
+    return success, output.getvalue()
+
 def main():
     """批量导出所有 db3 文件"""
     project_root = Path(__file__).parent.parent
@@ -26,28 +42,30 @@ def main():
     print(f"正在导出 build 目录下的所有 db3 文件...")
     print(f"找到 {len(db_files)} 个文件\n")
     
+    db_files = sorted(db_files)
     success_count = 0
-    for db_file in sorted(db_files):
-        db_name = db_file.stem
-        print(f"{'='*60}")
-        print(f"正在处理: {db_name}")
-        print(f"{'='*60}")
+    
+    # 每个 db3 文件相互独立，在各自的进程中导出；输出按文件顺序打印
+    with ProcessPoolExecutor(max_workers=min(len(db_files), os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(export_captured, db_file) for db_file in db_files]
         
-        try:
-            # 调用 export_db.py 的 --file 参数
-            result = subprocess.run(
-                [sys.executable, "scripts/export_db.py", "--file", str(db_file)],
-                cwd=project_root,
-                capture_output=False
-            )
+        for db_file, future in zip(db_files, futures):
+            db_name = db_file.stem
+            print(f"{'='*60}")
+            print(f"正在处理: {db_name}")
+            print(f"{'='*60}")
             
-            if result.returncode == 0:
-                success_count += 1
-                print(f"\n✓ {db_name} 导出成功\n")
-            else:
-                print(f"\n✗ {db_name} 导出失败\n")
-        except Exception as e:
-            print(f"✗ 导出 {db_name} 时出错: {e}\n")
+            try:
+                success, output = future.result()
+                print(output, end='')
+                
+                if success:
+                    success_count += 1
+                    print(f"\n✓ {db_name} 导出成功\n")
+                else:
+                    print(f"\n✗ {db_name} 导出失败\n")
+            except Exception as e:
+                print(f"✗ 导出 {db_name} 时出错: {e}\n")
     
     print(f"{'='*60}")
     print(f"完成: {success_count}/{len(db_files)} 个文件导出成功")
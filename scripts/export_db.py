@@ -5,47 +5,336 @@ Optional utility to extract data from the built databases.
 """
 
 import sqlite3
-import csv
-import json
 import sys
 import argparse
+import io
+import os
+import shutil
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+from itertools import chain, count
+from operator import itemgetter
 from pathlib import Path
 
-def export_table_to_csv(conn: sqlite3.Connection, table_name: str, output_path: Path):
-    """Export a table to CSV file."""
+try:
+    import orjson
+except ImportError:  # Optional: speeds up JSON export
+    import json
+    orjson = None
+
+# pyarrow (optional, required only for --parquet) is imported on first use
+# by import_pyarrow(); importing it costs more than the rest of start-up
+pa = None
+pq = None
+
+# Connection-level settings for reading; none of them touch the db3 file
+# (journal_mode would rewrite the header of a WAL database). Memory-mapped
+# I/O saves a read() and a page-cache copy per page on blob-heavy tables;
+# SQLite maps at most the file size, so 1 GB covers all but huge databases.
+READ_PRAGMAS = (
+    "PRAGMA query_only=1",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=1073741824",
+)
+
+FILE_WRITE_WORKERS = 8
+FILE_WRITE_BACKLOG = 32
+TABLE_EXPORT_WORKERS = 4
+CSV_WRITE_BUFFER = 1 << 20
+PARQUET_BATCH_ROWS = 65536
+
+def _quote(identifier: str) -> str:
+    """Quote a table or column name for use in SQL."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+def export_table_to_csv(conn: sqlite3.Connection, table_name: str, output_path: Path,
+                        sqlite_cli: str = None):
+    """Export a table to CSV file.
+    
+    Rows are streamed from the cursor into the writer, so memory use does
+    not depend on the table size. Lines end in '\n', like the CSV files
+    under data/. If sqlite_cli (the path of a sqlite3 executable) is given,
+    the CLI writes the file instead; see export_table_to_csv_cli.
+    """
+    if sqlite_cli and export_table_to_csv_cli(conn, table_name, output_path, sqlite_cli):
+        return
+    
+    import csv
+    
     cursor = conn.cursor()
-    cursor.execute(f"SELECT * FROM {table_name}")
+    cursor.execute(f"SELECT * FROM {_quote(table_name)}")
     
     columns = [description[0] for description in cursor.description]
-    rows = cursor.fetchall()
+    row_counter = count()
     
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
+    with open(output_path, 'w', newline='', encoding='utf-8', buffering=CSV_WRITE_BUFFER) as f:
+        writer = csv.writer(f, lineterminator='\n')
         writer.writerow(columns)
-        writer.writerows(rows)
+        writer.writerows(counted(cursor, row_counter))
+    
+    print(f"  Exported {next(row_counter)} rows from '{table_name}' to {output_path.name}")
+
+def export_table_to_csv_cli(conn: sqlite3.Connection, table_name: str, output_path: Path,
+                            sqlite_cli: str):
+    """Export a table to CSV with the sqlite3 command-line shell.
+    
+    The shell formats every row in C. Its quoting differs from the csv
+    module: text with spaces and empty strings are always quoted, so
+    NULL and '' stay distinguishable. The shell is started with an empty
+    init file so a user's ~/.sqliterc cannot change the output format.
+    
+    Returns False, leaving the table to the Python writer, if it is empty
+    (the shell would not print the header) or holds REAL values: the shell
+    prints them with 15 significant digits, which loses precision.
+    """
+    # Columns with TEXT affinity store REALs as text, all others may hold them
+    real_checks = []
+    for column in conn.execute(f"PRAGMA table_info({_quote(table_name)})"):
+        declared = (column[2] or '').upper()
+        if 'INT' in declared or not any(t in declared for t in ('CHAR', 'CLOB', 'TEXT')):
+            real_checks.append(f"typeof({_quote(column[1])}) = 'real'")
+    real_count = f"count(CASE WHEN {' OR '.join(real_checks)} THEN 1 END)" if real_checks else "0"
+    
+    row_count, real_rows = conn.execute(
+        f"SELECT count(*), {real_count} FROM {_quote(table_name)}"
+    ).fetchone()
+    if not row_count or real_rows:
+        return False
     
-    print(f"  Exported {len(rows)} rows from '{table_name}' to {output_path.name}")
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    with open(output_path, 'wb') as f:
+        result = subprocess.run(
+            [sqlite_cli, '-init', os.devnull, '-readonly', '-header', '-csv', db_file, f"SELECT * FROM {_quote(table_name)}"],
+            stdout=f, stderr=subprocess.PIPE
+        )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip()
+                           or f"sqlite3 exited with status {result.returncode}")
+    
+    print(f"  Exported {row_count} rows from '{table_name}' to {output_path.name}")
+    return True
+
+def counted(rows, counter):
+    """Pass rows through while advancing `counter` (an itertools.count) once per row.
+    
+    After the rows are consumed, next(counter) is the number of rows. Runs
+    entirely in C, unlike a counting generator.
+    """
+    return map(itemgetter(0), zip(rows, counter))
 
-def export_table_to_json(conn: sqlite3.Connection, table_name: str, output_path: Path):
-    """Export a table to JSON file."""
+def export_table_to_json(conn: sqlite3.Connection, table_name: str, output_path: Path,
+                         ndjson: bool = False):
+    """Export a table to JSON file.
+    
+    Rows are streamed from the cursor and written as one JSON object per
+    line: inside a JSON array by default, or as newline-delimited JSON
+    (no enclosing array) when ndjson is True.
+    """
     cursor = conn.cursor()
-    cursor.execute(f"SELECT * FROM {table_name}")
+    cursor.execute(f"SELECT * FROM {_quote(table_name)}")
     
     columns = [description[0] for description in cursor.description]
-    rows = cursor.fetchall()
     
-    data = [dict(zip(columns, row)) for row in rows]
+    with open(output_path, 'wb') as f:
+        row_count = write_json_rows(f, columns, cursor, ndjson)
+    
+    print(f"  Exported {row_count} rows from '{table_name}' to {output_path.name}")
+
+def write_json_rows(f, columns, rows, ndjson: bool = False):
+    """Write rows to the binary file f as JSON objects, one per line.
+    
+    The objects go inside a JSON array, or stand alone (NDJSON) when
+    ndjson is True. Returns the number of rows written.
+    """
+    row_count = 0
+    
+    if not ndjson:
+        f.write(b'[')
+    
+    for row in rows:
+        line = encode_json(dict(zip(columns, row)))
+        if ndjson:
+            f.write(line + b'\n')
+        else:
+            f.write((b',\n' if row_count else b'\n') + line)
+        row_count += 1
+    
+    if not ndjson:
+        f.write(b'\n]' if row_count else b']')
+    
+    return row_count
+
+def export_table_to_csv_and_json(conn: sqlite3.Connection, table_name: str, csv_path: Path,
+                                 json_path: Path, ndjson: bool = False):
+    """Export a table to both CSV and JSON from a single scan.
+    
+    Produces the same files as export_table_to_csv followed by
+    export_table_to_json, but runs the query once.
+    """
+    import csv
+    
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM {_quote(table_name)}")
+    
+    columns = [description[0] for description in cursor.description]
+    
+    with open(csv_path, 'w', newline='', encoding='utf-8', buffering=CSV_WRITE_BUFFER) as csv_file, \
+            open(json_path, 'wb') as json_file:
+        writer = csv.writer(csv_file, lineterminator='\n')
+        writer.writerow(columns)
+        
+        def rows_written_to_csv():
+            for row in cursor:
+                writer.writerow(row)
+                yield row
+        
+        row_count = write_json_rows(json_file, columns, rows_written_to_csv(), ndjson)
+    
+    print(f"  Exported {row_count} rows from '{table_name}' to {csv_path.name}")
+    print(f"  Exported {row_count} rows from '{table_name}' to {json_path.name}")
+
+def get_columns_info(conn: sqlite3.Connection, table_name: str):
+    """Return the PRAGMA table_info rows of a table."""
+    return conn.execute(f"PRAGMA table_info({_quote(table_name)})").fetchall()
+
+def export_table_to_parquet(conn: sqlite3.Connection, table_name: str, output_path: Path,
+                            columns_info=None):
+    """Export a table to a zstd-compressed Parquet file (requires pyarrow).
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+    Column types come from the declared column affinity, or are inferred
+    from the first batch for untyped columns; blobs are stored as binary.
+    SQLite does not enforce column types, so a column whose values do not
+    fit its Arrow type is written as strings instead and the export is
+    restarted.
+    """
+    if not import_pyarrow():
+        raise RuntimeError("pyarrow is required for Parquet export")
     
-    print(f"  Exported {len(rows)} rows from '{table_name}' to {output_path.name}")
+    if columns_info is None:
+        columns_info = get_columns_info(conn, table_name)
+    declared_types = {col[1]: arrow_type(col[2]) for col in columns_info}
+    text_columns = set()
+    
+    while True:
+        try:
+            row_count = write_parquet_file(conn, table_name, output_path, declared_types, text_columns)
+            break
+        except ColumnTypeError as e:
+            output_path.unlink(missing_ok=True)
+            text_columns.add(e.column)
+        except Exception:
+            # Do not leave a truncated file behind
+            output_path.unlink(missing_ok=True)
+            raise
+    
+    print(f"  Exported {row_count} rows from '{table_name}' to {output_path.name}")
 
-def is_file_table(table_name: str, conn: sqlite3.Connection):
-    """Check if a table is a file table (has ID, code, file_blob columns)."""
+class ColumnTypeError(ValueError):
+    """A column's values do not fit the Arrow type chosen for it."""
+    
+    def __init__(self, column: str):
+        super().__init__(f"column '{column}' has values of mixed types")
+        self.column = column
+
+def write_parquet_file(conn: sqlite3.Connection, table_name: str, output_path: Path,
+                       declared_types: dict, text_columns: set):
+    """Stream a table into a Parquet file in batches of PARQUET_BATCH_ROWS rows.
+    
+    Columns in text_columns are written as strings. Raises ColumnTypeError
+    for the first column whose values cannot be converted; returns the
+    number of rows written.
+    """
     cursor = conn.cursor()
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = cursor.fetchall()
+    cursor.execute(f"SELECT * FROM {_quote(table_name)}")
+    
+    columns = [description[0] for description in cursor.description]
+    rows = cursor.fetchmany(PARQUET_BATCH_ROWS)
+    row_count = 0
+    
+    # Untyped columns take the type pyarrow infers from the first batch;
+    # all-NULL or empty ones fall back to string
+    fields = []
+    for index, name in enumerate(columns):
+        column_type = pa.string() if name in text_columns else declared_types.get(name)
+        if column_type is None:
+            column_type = to_arrow_array([row[index] for row in rows], None, name).type
+        if pa.types.is_null(column_type):
+            column_type = pa.string()
+        fields.append(pa.field(name, column_type))
+    schema = pa.schema(fields)
+    
+    with pq.ParquetWriter(str(output_path), schema, compression='zstd') as writer:
+        while rows:
+            arrays = []
+            for values, field in zip(zip(*rows), schema):
+                if field.name in text_columns:
+                    values = [value if value is None or isinstance(value, str) else str(value)
+                              for value in values]
+                arrays.append(to_arrow_array(values, field.type, field.name))
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            row_count += len(rows)
+            rows = cursor.fetchmany(PARQUET_BATCH_ROWS)
+    
+    return row_count
+
+def to_arrow_array(values, arrow_type, column: str):
+    """Convert column values to an Arrow array, raising ColumnTypeError if they do not fit."""
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        raise ColumnTypeError(column) from None
+
+def import_pyarrow():
+    """Import pyarrow and pyarrow.parquet on first use; return False if not installed."""
+    global pa, pq
+    if pq is None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return False
+    return True
+
+def arrow_type(declared_type: str):
+    """Map a declared SQLite column type to an Arrow type by its affinity.
+    
+    Returns None for NUMERIC affinity and untyped columns, whose values
+    may mix storage classes; their type is inferred from the data.
+    """
+    declared = (declared_type or '').upper()
+    if 'INT' in declared:
+        return pa.int64()
+    if 'CHAR' in declared or 'CLOB' in declared or 'TEXT' in declared:
+        return pa.string()
+    if 'BLOB' in declared:
+        return pa.binary()
+    if 'REAL' in declared or 'FLOA' in declared or 'DOUB' in declared:
+        return pa.float64()
+    return None
+
+def encode_json(obj) -> bytes:
+    """Encode obj as compact UTF-8 JSON, using orjson when it is installed.
+    
+    Values JSON cannot represent (such as blobs) are written as str(value).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, default=str, separators=(',', ':')).encode('utf-8')
+
+def is_file_table(table_name: str, conn: sqlite3.Connection, columns_info=None):
+    """Check if a table is a file table (has ID, code, file_blob columns).
+    
+    columns_info is the table's PRAGMA table_info result; it is queried
+    when not given.
+    """
+    columns = columns_info if columns_info is not None else get_columns_info(conn, table_name)
+    if len(columns) < 3:
+        return False
     
     # Get column names
     col_names = [col[1].lower() for col in columns]
@@ -57,13 +346,21 @@ def is_file_table(table_name: str, conn: sqlite3.Connection):
     
     return has_id and has_code and has_blob
 
-def export_file_table(conn: sqlite3.Connection, table_name: str, output_dir: Path):
-    """Export a file table (ID, code, file_blob) to directory structure."""
+def export_file_table(conn: sqlite3.Connection, table_name: str, output_dir: Path,
+                      columns_info=None, archive: bool = False, fileio: str = None):
+    """Export a file table (ID, code, file_blob) to directory structure.
+    
+    columns_info is the table's PRAGMA table_info result; it is queried
+    when not given. With archive=True the files are written into a single
+    uncompressed {table_name}.tar instead of a {table_name}/ directory.
+    If fileio (the full path of SQLite's fileio extension library) is
+    given, the files are written with its writefile() function.
+    """
     cursor = conn.cursor()
     
     # Get column names first to handle case sensitivity
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns_info = cursor.fetchall()
+    if columns_info is None:
+        columns_info = get_columns_info(conn, table_name)
     col_names = {}
     for col in columns_info:
         col_names[col[1].lower()] = col[1]  # Store original case
@@ -73,55 +370,182 @@ def export_file_table(conn: sqlite3.Connection, table_name: str, output_dir: Pat
     code_col = col_names.get('code', 'code')
     blob_col = col_names.get('file_blob', col_names.get('fileblob', 'file_blob'))
     
-    cursor.execute(f"SELECT {id_col}, {code_col}, {blob_col} FROM {table_name}")
-    rows = cursor.fetchall()
+    cursor.execute(f"SELECT {_quote(id_col)}, {_quote(code_col)}, {_quote(blob_col)} FROM {_quote(table_name)}")
+    first_row = cursor.fetchone()
     
-    if not rows:
+    if first_row is None:
         print(f"  ⚠ Table '{table_name}' is empty")
         return 0
     
+    if archive:
+        return export_file_table_to_tar(table_name, chain((first_row,), cursor),
+                                        output_dir / f"{table_name}.tar")
+    
     # Create subdirectory for this table
     table_dir = output_dir / table_name
     table_dir.mkdir(parents=True, exist_ok=True)
     
+    # With SQLite's fileio extension, writefile() dumps every blob from C
+    if fileio and load_fileio(conn, fileio):
+        file_count = write_files_with_fileio(conn, table_name, table_dir, code_col, blob_col)
+        if file_count is not None:
+            print(f"  Exported {file_count} file(s) from table '{table_name}' to {table_dir.name}/")
+            return file_count
+    
+    # Rows are streamed from the cursor and written by a small thread pool;
+    # os.write releases the GIL, so several files are written at once.
+    # At most FILE_WRITE_BACKLOG writes are in flight to bound memory use.
     file_count = 0
-    for row in rows:
-        file_id, code, file_blob = row
-        if file_blob and code:
-            file_path = table_dir / code
-            try:
-                with open(file_path, 'wb') as f:
-                    if isinstance(file_blob, bytes):
-                        f.write(file_blob)
-                    else:
-                        f.write(bytes(file_blob))
-                file_count += 1
-            except Exception as e:
-                print(f"    ✗ Error writing file {code}: {e}")
+    pending = deque()
+    
+    def collect(entry):
+        nonlocal file_count
+        code, future = entry
+        try:
+            future.result()
+            file_count += 1
+        except Exception as e:
+            print(f"    ✗ Error writing file {code}: {e}")
+    
+    with ThreadPoolExecutor(max_workers=FILE_WRITE_WORKERS) as executor:
+        for file_id, code, file_blob in chain((first_row,), cursor):
+            if file_blob and code:
+                pending.append((code, executor.submit(write_file, table_dir / code, file_blob)))
+                if len(pending) >= FILE_WRITE_BACKLOG:
+                    collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
     
     print(f"  Exported {file_count} file(s) from table '{table_name}' to {table_dir.name}/")
     return file_count
 
+def export_file_table_to_tar(table_name: str, rows, tar_path: Path):
+    """Write (ID, code, file_blob) rows into one uncompressed tar archive.
+    
+    A single archive avoids creating thousands of small files, which is
+    slow on NTFS in particular; extract it with tar -xf when needed.
+    """
+    import tarfile
+    import time
+    
+    file_count = 0
+    mtime = time.time()
+    
+    try:
+        with tarfile.open(tar_path, 'w') as tar:
+            for file_id, code, file_blob in rows:
+                if file_blob and code:
+                    try:
+                        data = memoryview(file_blob)
+                    except TypeError as e:
+                        print(f"    ✗ Error writing file {code}: {e}")
+                        continue
+                    info = tarfile.TarInfo(code)
+                    info.size = data.nbytes
+                    info.mtime = mtime
+                    tar.addfile(info, io.BytesIO(data))
+                    file_count += 1
+    except Exception:
+        # Do not leave a truncated archive behind
+        tar_path.unlink(missing_ok=True)
+        raise
+    
+    print(f"  Exported {file_count} file(s) from table '{table_name}' to {tar_path.name}")
+    return file_count
+
+def load_fileio(conn: sqlite3.Connection, library_path: str):
+    """Try to load SQLite's fileio extension (writefile()) into conn.
+    
+    library_path is the full path of the extension library; it is never
+    looked up by bare name, so no other library on the loader path can be
+    picked up. Returns False, after printing a warning, when the sqlite3
+    module cannot load extensions or loading the library fails.
+    """
+    if not hasattr(conn, 'enable_load_extension'):
+        print("  ⚠ This Python's sqlite3 module cannot load extensions, writing files with Python")
+        return False
+    try:
+        conn.enable_load_extension(True)
+        try:
+            conn.load_extension(library_path)
+        finally:
+            conn.enable_load_extension(False)
+        return True
+    except sqlite3.Error as e:
+        print(f"  ⚠ Cannot load fileio extension ({e}), writing files with Python")
+        return False
+
+def write_files_with_fileio(conn: sqlite3.Connection, table_name: str, table_dir: Path,
+                            code_col: str, blob_col: str):
+    """Write every file of a table with one writefile() query.
+    
+    The mode argument (0o644) makes writefile() raise on a failed write;
+    without it the function just returns NULL. As a further check, the
+    number of files written must match the number of eligible rows.
+    
+    Returns the number of files written, or None if any write failed; the
+    caller then rewrites the table row by row so each failing file is
+    reported on its own.
+    """
+    try:
+        cursor = conn.execute(
+            f"SELECT count(*), count(writefile(? || {_quote(code_col)}, {_quote(blob_col)}, 420)) "
+            f"FROM {_quote(table_name)} "
+            f"WHERE {_quote(code_col)} <> '' AND length({_quote(blob_col)}) > 0",
+            (str(table_dir) + os.sep,)
+        )
+        row_count, file_count = cursor.fetchone()
+    except sqlite3.Error:
+        return None
+    return file_count if file_count == row_count else None
+
+def write_file(file_path: Path, data):
+    """Write bytes-like data to file_path with unbuffered os-level I/O."""
+    view = memoryview(data)
+    fd = os.open(str(file_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 def list_tables(conn: sqlite3.Connection):
-    """List all tables in the database."""
+    """List all tables in the database (excluding ANALYZE statistics)."""
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
+        "SELECT name FROM sqlite_master WHERE type='table' "
+        "AND name NOT LIKE 'sqlite_stat%' ORDER BY name"
     )
     tables = [row[0] for row in cursor.fetchall()]
     return tables
 
-def show_table_info(conn: sqlite3.Connection, table_name: str):
+def read_schema(conn: sqlite3.Connection):
+    """Map every table listed by list_tables to its PRAGMA table_info rows.
+    
+    Uses one query joining sqlite_master with the pragma_table_info()
+    table-valued function instead of one PRAGMA per table.
+    """
+    cursor = conn.execute(
+        "SELECT m.name, p.cid, p.name, p.type, p.\"notnull\", p.dflt_value, p.pk "
+        "FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p "
+        "WHERE m.type='table' AND m.name NOT LIKE 'sqlite_stat%' "
+        "ORDER BY m.name, p.cid"
+    )
+    schema = {}
+    for table, *column in cursor:
+        schema.setdefault(table, []).append(tuple(column))
+    return schema
+
+def show_table_info(conn: sqlite3.Connection, table_name: str, columns_info=None):
     """Show information about a table."""
     cursor = conn.cursor()
     
     # Get row count
-    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+    cursor.execute(f"SELECT COUNT(*) FROM {_quote(table_name)}")
     row_count = cursor.fetchone()[0]
     
     # Get column info
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = cursor.fetchall()
+    columns = columns_info if columns_info is not None else get_columns_info(conn, table_name)
     
     print(f"\n  Table: {table_name}")
     print(f"  Rows: {row_count}")
@@ -135,14 +559,29 @@ def show_table_info(conn: sqlite3.Connection, table_name: str):
 
 def get_available_databases(build_dir: Path):
     """Get list of available db3 files in build directory."""
+    return sorted(get_database_sizes(build_dir))
+
+def get_database_sizes(build_dir: Path):
+    """Map the name of each db3 file in build directory to its size in bytes.
+    
+    Uses a single os.scandir pass; the sizes come from the directory
+    entries, so no file is stat()ed twice.
+    """
     if not build_dir.exists():
-        return []
+        return {}
     
-    db_files = list(build_dir.glob("*.db3"))
-    return sorted([db.stem for db in db_files])
+    with os.scandir(build_dir) as entries:
+        return {
+            entry.name[:-4]: entry.stat().st_size
+            for entry in entries
+            if entry.name.endswith('.db3') and entry.is_file()
+        }
 
 def export_database_from_path(db_path: Path, output_dir: Path = None, show_info: bool = False, 
-                               export_csv: bool = True, export_json: bool = False):
+                               export_csv: bool = True, export_json: bool = False,
+                               ndjson: bool = False, export_parquet: bool = False,
+                               sqlite_cli: str = None, archive: bool = False,
+                               fileio: str = None):
     """Export a database from specified path to output directory.
     
     Args:
@@ -151,6 +590,11 @@ def export_database_from_path(db_path: Path, output_dir: Path = None, show_info:
         show_info: Whether to show detailed table information
         export_csv: Whether to export CSV files (default: True)
         export_json: Whether to export JSON files (default: False)
+        ndjson: Write JSON as newline-delimited *.ndjson files (default: False)
+        export_parquet: Whether to export Parquet files (default: False, requires pyarrow)
+        sqlite_cli: Path of a sqlite3 executable to write CSV files with (default: None)
+        archive: Write each file table as one .tar archive (default: False)
+        fileio: Full path of SQLite's fileio extension to write file tables with (default: None)
     """
     if not db_path.exists():
         print(f"Error: Database file not found: {db_path}")
@@ -162,18 +606,19 @@ def export_database_from_path(db_path: Path, output_dir: Path = None, show_info:
     
     db_name = db_path.stem
     
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
+    conn = connect_for_export(db_path)
     
     print(f"\n{'='*60}")
     print(f"Exporting database: {db_name}")
     print(f"Source: {db_path}")
     print(f"Output: {output_dir}")
-    print(f"Format: CSV={export_csv}, JSON={export_json}")
+    print(f"Format: CSV={export_csv}, JSON={export_json}, Parquet={export_parquet}")
     print(f"{'='*60}")
     
-    # List all tables
-    tables = list_tables(conn)
+    # List all tables with their columns in one query; classification,
+    # --info and file/Parquet export all reuse the column info
+    schema = read_schema(conn)
+    tables = list(schema)
     
     if not tables:
         print("  No tables found in database.")
@@ -184,7 +629,7 @@ def export_database_from_path(db_path: Path, output_dir: Path = None, show_info:
     if show_info:
         print(f"\nFound {len(tables)} table(s):")
         for table in tables:
-            show_table_info(conn, table)
+            show_table_info(conn, table, schema[table])
     
     # Create export directories
     tables_dir = output_dir / "tables"
@@ -197,46 +642,172 @@ def export_database_from_path(db_path: Path, output_dir: Path = None, show_info:
     file_tables = []
     
     for table in tables:
-        if is_file_table(table, conn):
+        if is_file_table(table, conn, schema[table]):
             file_tables.append(table)
         else:
             data_tables.append(table)
     
-    # Export data tables to tables directory
-    if data_tables:
-        print(f"\nExporting data tables to: {tables_dir}")
-        for table in data_tables:
-            try:
-                if export_csv:
-                    csv_path = tables_dir / f"{table}.csv"
-                    export_table_to_csv(conn, table, csv_path)
-                if export_json:
-                    json_path = tables_dir / f"{table}.json"
-                    export_table_to_json(conn, table, json_path)
-            except Exception as e:
-                print(f"  ✗ Error exporting table '{table}': {e}")
-    
-    # Export file tables to files directory
-    if file_tables:
-        print(f"\nExporting file tables to: {files_dir}")
-        for table in file_tables:
-            try:
-                export_file_table(conn, table, files_dir)
-            except Exception as e:
-                print(f"  ✗ Error exporting file table '{table}': {e}")
-    
     conn.close()
+    
+    # Tables are exported on a thread pool, each task with its own read-only
+    # connection. Each task's output is buffered and printed in table order.
+    output = ThreadOutput(sys.stdout)
+    with redirect_stdout(output), ThreadPoolExecutor(max_workers=TABLE_EXPORT_WORKERS) as executor:
+        data_futures = [
+            executor.submit(output.capture, export_data_table, db_path, table, tables_dir,
+                            export_csv, export_json, ndjson, export_parquet, schema[table], sqlite_cli)
+            for table in data_tables
+        ]
+        file_futures = [
+            executor.submit(output.capture, export_file_table_from_path, db_path, table, files_dir,
+                            schema[table], archive, fileio)
+            for table in file_tables
+        ]
+        
+        # Export data tables to tables directory
+        if data_tables:
+            print(f"\nExporting data tables to: {tables_dir}")
+            for future in data_futures:
+                print(future.result(), end='')
+        
+        # Export file tables to files directory
+        if file_tables:
+            print(f"\nExporting file tables to: {files_dir}")
+            for future in file_futures:
+                print(future.result(), end='')
+    
     print(f"\n✓ Export completed for {db_name}")
     return True
 
+def connect_for_export(db_path: Path):
+    """Open a read-only connection to db_path with READ_PRAGMAS applied."""
+    conn = sqlite3.connect(str(db_path))
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def export_data_table(db_path: Path, table: str, tables_dir: Path, export_csv: bool,
+                      export_json: bool, ndjson: bool, export_parquet: bool = False,
+                      columns_info=None, sqlite_cli: str = None):
+    """Export one data table to CSV, JSON and/or Parquet on its own connection."""
+    conn = connect_for_export(db_path)
+    try:
+        csv_path = tables_dir / f"{table}.csv"
+        json_path = tables_dir / f"{table}.{'ndjson' if ndjson else 'json'}"
+        if export_csv and export_json and not sqlite_cli:
+            # One scan feeds both files
+            export_table_to_csv_and_json(conn, table, csv_path, json_path, ndjson)
+        else:
+            if export_csv:
+                export_table_to_csv(conn, table, csv_path, sqlite_cli)
+            if export_json:
+                export_table_to_json(conn, table, json_path, ndjson)
+        if export_parquet:
+            parquet_path = tables_dir / f"{table}.parquet"
+            export_table_to_parquet(conn, table, parquet_path, columns_info)
+    except Exception as e:
+        print(f"  ✗ Error exporting table '{table}': {e}")
+    finally:
+        conn.close()
+
+def export_file_table_from_path(db_path: Path, table: str, files_dir: Path, columns_info=None,
+                                archive: bool = False, fileio: str = None):
+    """Export one file table to files_dir on its own connection."""
+    conn = connect_for_export(db_path)
+    try:
+        export_file_table(conn, table, files_dir, columns_info, archive, fileio)
+    except Exception as e:
+        print(f"  ✗ Error exporting file table '{table}': {e}")
+    finally:
+        conn.close()
+
+class ThreadOutput(io.TextIOBase):
+    """A stdout stand-in that lets worker threads buffer their own output.
+    
+    Text written from inside capture() goes to that thread's buffer; any
+    other text goes straight to the wrapped stream.
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        return getattr(self.local, 'buffer', self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def capture(self, func, *args):
+        """Call func(*args) and return everything it printed as a string."""
+        self.local.buffer = io.StringIO()
+        try:
+            func(*args)
+            return self.local.buffer.getvalue()
+        finally:
+            del self.local.buffer
+
+def export_one(db_file: str, output: str = None, show_info: bool = False,
+               export_csv: bool = True, export_json: bool = False, ndjson: bool = False,
+               export_parquet: bool = False, sqlite_cli: str = None, archive: bool = False,
+               fileio: str = None):
+    """Export a single db3 file, resolving paths like the --file option does.
+    
+    Relative paths are tried against the current directory first and then
+    the project root; a relative output directory is taken from the
+    project root.
+    """
+    project_root = Path(__file__).parent.parent
+    
+    db_path = Path(db_file)
+    if not db_path.is_absolute():
+        # Try relative to current directory first
+        if not db_path.exists():
+            # Try relative to project root
+            db_path = project_root / db_file
+    
+    output_dir = None
+    if output:
+        output_dir = Path(output)
+        if not output_dir.is_absolute():
+            output_dir = project_root / output
+    
+    return export_database_from_path(db_path, output_dir, show_info, export_csv, export_json, ndjson,
+                                     export_parquet, sqlite_cli, archive, fileio)
+
 def export_database(db_name: str, project_root: Path, build_dir: Path, export_dir: Path, 
-                    show_info: bool = False, export_csv: bool = True, export_json: bool = False):
+                    show_info: bool = False, export_csv: bool = True, export_json: bool = False,
+                    ndjson: bool = False, export_parquet: bool = False, sqlite_cli: str = None,
+                    archive: bool = False, fileio: str = None):
     """Export a single database (legacy function for backward compatibility)."""
     db_path = build_dir / f"{db_name}.db3"
     
     # Use the database name as export directory name
     db_export_dir = export_dir / db_name
-    return export_database_from_path(db_path, db_export_dir, show_info, export_csv, export_json)
+    return export_database_from_path(db_path, db_export_dir, show_info, export_csv, export_json, ndjson,
+                                     export_parquet, sqlite_cli, archive, fileio)
+
+def export_database_captured(db_name: str, project_root: Path, build_dir: Path, export_dir: Path,
+                             show_info: bool = False, export_csv: bool = True,
+                             export_json: bool = False, ndjson: bool = False,
+                             export_parquet: bool = False, sqlite_cli: str = None,
+                             archive: bool = False, fileio: str = None):
+    """Export a database in a worker process and return (success, output).
+    
+    Output is buffered so logs of databases exported in parallel do not interleave.
+    An unexpected exception is reported in the output and counts as a
+    failed export, so the other databases' logs and the summary still print.
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        try:
+            success = export_database(db_name, project_root, build_dir, export_dir, show_info,
+                                      export_csv, export_json, ndjson, export_parquet, sqlite_cli,
+                                      archive, fileio)
+        except Exception as e:
+            print(f"✗ Error exporting database {db_name}: {e}")
+            success = False
+    return success, output.getvalue()
 
 def main():
     """Main function to export databases."""
@@ -251,6 +822,9 @@ Examples:
   # Export specific databases from build directory
   python scripts/export_db.py ZWCAD_Arch USERCompLib
   
+  # Export all databases, at most 2 at a time
+  python scripts/export_db.py --all --jobs 2
+  
   # Export a specific db3 file to its same directory
   python scripts/export_db.py --file build/ZWCAD_Arch.db3
   
@@ -266,6 +840,21 @@ Examples:
   # Export both CSV and JSON
   python scripts/export_db.py --file build/ZWCAD_Arch.db3 --json
   
+  # Export newline-delimited JSON (*.ndjson) instead of JSON arrays
+  python scripts/export_db.py --file build/ZWCAD_Arch.db3 --ndjson
+  
+  # Also export Parquet files (requires pyarrow)
+  python scripts/export_db.py --file build/ZWCAD_Arch.db3 --parquet
+  
+  # Write CSV files with the sqlite3 command-line shell, if installed
+  python scripts/export_db.py --all --sqlite-cli
+  
+  # Write each file table as one files/<table>.tar archive
+  python scripts/export_db.py --file build/ZWCAD_Arch.db3 --archive
+  
+  # Write file tables with SQLite's fileio extension (full library path)
+  python scripts/export_db.py --all --fileio /usr/local/lib/fileio.so
+  
   # List available databases
   python scripts/export_db.py --list
   
@@ -322,12 +911,70 @@ Examples:
         default=False,
         help='Also export JSON format (default: only CSV is exported)'
     )
+    parser.add_argument(
+        '--ndjson',
+        action='store_true',
+        default=False,
+        help='Export JSON as newline-delimited JSON (*.ndjson, implies --json)'
+    )
+    parser.add_argument(
+        '--parquet',
+        action='store_true',
+        default=False,
+        help='Also export Parquet format (requires pyarrow)'
+    )
+    parser.add_argument(
+        '--sqlite-cli',
+        action='store_true',
+        default=False,
+        help='Write CSV files with the sqlite3 command-line shell when it is on PATH '
+             '(faster; quotes every text field containing spaces; tables with REAL '
+             'values still use the Python writer)'
+    )
+    parser.add_argument(
+        '--archive',
+        action='store_true',
+        default=False,
+        help='Write each file table as one uncompressed files/<table>.tar instead of a directory'
+    )
+    parser.add_argument(
+        '--fileio',
+        type=str,
+        metavar='PATH',
+        help="Full path of SQLite's fileio extension library; file tables are then "
+             "written with its writefile() function (default: Python writer)"
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of databases to export in parallel (default: CPU count)'
+    )
     
     args = parser.parse_args()
     
     # Set default: CSV enabled by default, JSON disabled by default
     export_csv = args.csv if args.csv is not None else True
-    export_json = args.json
+    export_json = args.json or args.ndjson
+    
+    if args.parquet and not import_pyarrow():
+        print("Error: --parquet requires pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    
+    sqlite_cli = None
+    if args.sqlite_cli:
+        sqlite_cli = shutil.which('sqlite3')
+        if sqlite_cli is None:
+            print("⚠ sqlite3 command not found on PATH, writing CSV files with Python")
+    
+    fileio = None
+    if args.fileio:
+        # Always a full path, so the loader never searches for the library
+        fileio = Path(args.fileio).resolve()
+        if not fileio.is_file():
+            print(f"Error: fileio extension not found: {fileio}")
+            sys.exit(1)
+        fileio = str(fileio)
     
     project_root = Path(__file__).parent.parent
     build_dir = project_root / "build"
@@ -335,33 +982,20 @@ Examples:
     
     # Handle --file option (export specific db3 file)
     if args.file:
-        db_path = Path(args.file)
-        if not db_path.is_absolute():
-            # Try relative to current directory first
-            if not db_path.exists():
-                # Try relative to project root
-                db_path = project_root / args.file
-        
-        output_dir = None
-        if args.output:
-            output_dir = Path(args.output)
-            if not output_dir.is_absolute():
-                output_dir = project_root / args.output
-        
-        export_database_from_path(db_path, output_dir, args.info, export_csv, export_json)
+        export_one(args.file, args.output, args.info, export_csv, export_json, args.ndjson,
+                   args.parquet, sqlite_cli, args.archive, fileio)
         return
     
     # Get available databases
-    available_databases = get_available_databases(build_dir)
+    database_sizes = get_database_sizes(build_dir)
+    available_databases = sorted(database_sizes)
     
     # List databases if requested
     if args.list:
         print("Available database files in build directory:")
         if available_databases:
             for db in available_databases:
-                db_path = build_dir / f"{db}.db3"
-                size = db_path.stat().st_size
-                size_kb = size / 1024
+                size_kb = database_sizes[db] / 1024
                 print(f"  - {db} ({size_kb:.2f} KB)")
         else:
             print("  No database files found. Run build_db.py first.")
@@ -395,11 +1029,30 @@ Examples:
     
     # Export databases
     print(f"Exporting {len(databases_to_export)} database(s)...")
-    success_count = 0
+    jobs = max(1, min(args.jobs, len(databases_to_export)))
+    
+    if jobs == 1:
+        results = [
+            export_database(db_name, project_root, build_dir, export_dir, args.info, export_csv,
+                            export_json, args.ndjson, args.parquet, sqlite_cli, args.archive,
+                            fileio)
+            for db_name in databases_to_export
+        ]
+    else:
+        # Each database is a separate file, so databases export independently
+        from concurrent.futures import ProcessPoolExecutor
+        
+        results = []
+        export = partial(export_database_captured, project_root=project_root, build_dir=build_dir,
+                         export_dir=export_dir, show_info=args.info, export_csv=export_csv,
+                         export_json=export_json, ndjson=args.ndjson, export_parquet=args.parquet,
+                         sqlite_cli=sqlite_cli, archive=args.archive, fileio=fileio)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for success, output in executor.map(export, databases_to_export):
+                print(output, end='')
+                results.append(success)
     
-    for db_name in databases_to_export:
-        if export_database(db_name, project_root, build_dir, export_dir, args.info, export_csv, export_json):
-            success_count += 1
+    success_count = sum(results)
     
     print(f"\n{'='*60}")
     print(f"Completed: {success_count}/{len(databases_to_export)} database(s) exported successfully")
@@ -3,6 +3,7 @@
 根据 data 目录下的现有文件结构，自动生成 tables.config 和 files/tables.config 配置文件。
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -10,33 +11,32 @@ def generate_tables_config(target_dir: Path):
     """根据 tables/ 目录下的 CSV 文件生成 tables.config"""
     tables_dir = target_dir / "tables"
     
-    if not tables_dir.exists():
+    # 获取所有 CSV 文件（排除 config.config 等配置文件）；目录不存在时由 scandir 报错，无需先 exists()
+    try:
+        with os.scandir(tables_dir) as entries:
+            csv_files = [entry.name[:-4] for entry in entries
+                         if entry.name.endswith('.csv') and not entry.name.endswith('.config.csv')
+                         and entry.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
         return False
     
-    # 获取所有 CSV 文件（排除 config.config 等配置文件）
-    csv_files = [f.stem for f in tables_dir.glob("*.csv") 
-                 if not f.stem.endswith('.config')]
-    
     if not csv_files:
         return False
     
     # 排序表名
     csv_files = sorted(csv_files)
     
-    # 生成配置文件内容
-    config_content = "# Tables configuration\n"
-    config_content += "# List of table names to be included in the database\n"
-    config_content += "# CSV file names should match table names (e.g., users.csv -> users table)\n"
-    config_content += "# Auto-generated based on existing CSV files\n"
-    config_content += "\n"
-    
-    for table_name in csv_files:
-        config_content += f"{table_name}\n"
-    
-    # 写入文件
+    # 生成配置文件内容并写入文件
+    lines = [
+        "# Tables configuration",
+        "# List of table names to be included in the database",
+        "# CSV file names should match table names (e.g., users.csv -> users table)",
+        "# Auto-generated based on existing CSV files",
+        "",
+        *csv_files,
+    ]
     config_path = tables_dir / "tables.config"
-    with open(config_path, 'w', encoding='utf-8') as f:
-        f.write(config_content)
+    config_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
     
     print(f"  ✓ 生成 tables.config: {len(csv_files)} 个表")
     return True
@@ -45,37 +45,32 @@ def generate_files_config(target_dir: Path):
     """根据 files/ 目录下的子目录生成 files/tables.config"""
     files_dir = target_dir / "files"
     
-    if not files_dir.exists():
+    # 获取所有子目录（排除隐藏目录、文件和 tables 目录）；DirEntry 自带类型信息，无需逐个 stat
+    try:
+        with os.scandir(files_dir) as entries:
+            subdirs = [entry.name for entry in entries
+                       if entry.is_dir() and not entry.name.startswith('.')
+                       and entry.name != 'tables']
+    except (FileNotFoundError, NotADirectoryError):
         return False
     
-    # 获取所有子目录（排除隐藏目录和文件）
-    subdirs = [d.name for d in files_dir.iterdir() 
-               if d.is_dir() and not d.name.startswith('.') and d.name != 'tables']
-    
-    # 过滤掉 tables.config 文件所在的目录（如果存在）
-    if 'tables' in subdirs:
-        subdirs.remove('tables')
-    
     if not subdirs:
         return False
     
     # 排序目录名
     subdirs = sorted(subdirs)
     
-    # 生成配置文件内容
-    config_content = "# Files tables configuration\n"
-    config_content += "# List of table names to be created from subdirectories\n"
-    config_content += "# Each subdirectory name should match a table name\n"
-    config_content += "# Auto-generated based on existing subdirectories\n"
-    config_content += "\n"
-    
-    for table_name in subdirs:
-        config_content += f"{table_name}\n"
-    
-    # 写入文件
+    # 生成配置文件内容并写入文件
+    lines = [
+        "# Files tables configuration",
+        "# List of table names to be created from subdirectories",
+        "# Each subdirectory name should match a table name",
+        "# Auto-generated based on existing subdirectories",
+        "",
+        *subdirs,
+    ]
     config_path = files_dir / "tables.config"
-    with open(config_path, 'w', encoding='utf-8') as f:
-        f.write(config_content)
+    config_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
     
     print(f"  ✓ 生成 files/tables.config: {len(subdirs)} 个文件表")
     return True
@@ -84,7 +79,7 @@ def process_database(target_name: str, data_dir: Path):
     """处理单个数据库目标目录"""
     target_dir = data_dir / target_name
     
-    if not target_dir.exists() or not target_dir.is_dir():
+    if not target_dir.is_dir():
         return False
     
     print(f"\n处理数据库: {target_name}")
@@ -108,13 +103,16 @@ def main():
         print(f"错误: data 目录不存在: {data_dir}")
         return
     
-    # 获取所有数据库目标目录
+    # 获取所有数据库目标目录（每个目录只列出一次，代替逐个 exists() 检查）
     targets = []
-    for item in data_dir.iterdir():
-        if item.is_dir() and not item.name.startswith('.'):
-            # 检查是否有 tables 或 files 目录
-            if (item / "tables").exists() or (item / "files").exists():
-                targets.append(item.name)
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if entry.is_dir() and not entry.name.startswith('.'):
+                # 检查是否有 tables 或 files 目录
+                with os.scandir(entry.path) as children:
+                    names = {child.name for child in children}
+                if "tables" in names or "files" in names:
+                    targets.append(entry.name)
     
     if not targets:
         print(f"未找到任何数据库目标目录在 {data_dir}")
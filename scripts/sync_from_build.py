@@ -3,17 +3,39 @@
 将 build 目录下的所有 db3 文件导出并同步到 data 目录下对应的数据库目标目录。
 """
 
+import argparse
+import io
+import os
+import sqlite3
 import sys
+from contextlib import redirect_stdout
+from functools import partial
 from pathlib import Path
 
 # Add parent directory to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from scripts.export_db import export_database_from_path
+SNAPSHOT_NAME = "snapshot.db3"
 
-def sync_database_to_data(db_file: Path, project_root: Path):
-    """将单个 db3 文件同步到 data 目录下对应的目标目录。"""
+def write_snapshot(db_file: Path, snapshot_path: Path):
+    """用 VACUUM INTO 将数据库按页复制为一个紧凑的快照文件，不经过 Python 逐行处理。"""
+    snapshot_path.unlink(missing_ok=True)  # VACUUM INTO 要求目标文件不存在
+    conn = sqlite3.connect(str(db_file))
+    try:
+        conn.execute("VACUUM INTO ?", (str(snapshot_path),))
+    finally:
+        conn.close()
+    print(f"  ✓ 已写入快照: {snapshot_path.name}")
+
+def sync_database_to_data(db_file: Path, project_root: Path, snapshot: bool = False):
+    """将单个 db3 文件同步到 data 目录下对应的目标目录。
+    
+    snapshot 为 True 时，先在目标目录下写入 snapshot.db3 快照，供可以直接读取 SQLite 的使用方使用。
+    """
+    # 在用到时才导入，--help 等不导出的调用无需加载导出模块
+    from scripts.export_db import export_database_from_path
+    
     db_name = db_file.stem
     
     # 确定目标目录：data/{数据库名}/
@@ -21,13 +43,10 @@ def sync_database_to_data(db_file: Path, project_root: Path):
     
     if not target_dir.exists():
         print(f"  ⚠ 目标目录不存在，正在创建: {target_dir}")
-        target_dir.mkdir(parents=True, exist_ok=True)
     
-    # 创建 tables 和 files 子目录
-    tables_dir = target_dir / "tables"
-    files_dir = target_dir / "files"
-    tables_dir.mkdir(parents=True, exist_ok=True)
-    files_dir.mkdir(parents=True, exist_ok=True)
+    # 创建 tables 和 files 子目录（parents=True 会一并创建目标目录）
+    for subdir in (target_dir / "tables", target_dir / "files"):
+        subdir.mkdir(parents=True, exist_ok=True)
     
     print(f"\n{'='*60}")
     print(f"同步数据库: {db_name}")
@@ -37,6 +56,8 @@ def sync_database_to_data(db_file: Path, project_root: Path):
     
     # 导出到目标目录（tables/ 和 files/ 会自动创建）
     try:
+        if snapshot:
+            write_snapshot(db_file, target_dir / SNAPSHOT_NAME)
         success = export_database_from_path(db_file, target_dir, show_info=False, 
                                            export_csv=True, export_json=False)
         if success:
@@ -49,8 +70,36 @@ def sync_database_to_data(db_file: Path, project_root: Path):
         print(f"✗ 同步 {db_name} 时出错: {e}")
         return False
 
+def sync_database_captured(db_file: Path, project_root: Path, snapshot: bool = False):
+    """在工作进程中同步单个 db3 文件，返回 (是否成功, 输出内容)。
+    
+    意外异常会写入输出并记为同步失败，其他数据库的输出和汇总仍会打印。
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
+        try:
+            success = sync_database_to_data(db_file, project_root, snapshot)
+        except Exception as e:
+            print(f"✗ 同步 {db_file.stem} 时出错: {e}")
+            success = False
+    return success, output.getvalue()
+
 def main():
     """主函数：同步所有 build 目录下的 db3 文件到 data 目录。"""
+    parser = argparse.ArgumentParser(description='将 build 目录下的 db3 文件同步到 data 目录')
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='并行同步的数据库数量（默认: CPU 核心数）'
+    )
+    parser.add_argument(
+        '--snapshot',
+        action='store_true',
+        help=f'同时在每个目标目录下写入 {SNAPSHOT_NAME} 快照（VACUUM INTO）'
+    )
+    args = parser.parse_args()
+    
     project_root = Path(__file__).parent.parent
     build_dir = project_root / "build"
     
@@ -68,10 +117,23 @@ def main():
     print(f"找到 {len(db_files)} 个 db3 文件")
     print(f"开始同步到 data 目录...\n")
     
-    success_count = 0
-    for db_file in sorted(db_files):
-        if sync_database_to_data(db_file, project_root):
-            success_count += 1
+    db_files = sorted(db_files)
+    jobs = max(1, min(args.jobs, len(db_files)))
+    
+    if jobs == 1:
+        results = [sync_database_to_data(db_file, project_root, args.snapshot) for db_file in db_files]
+    else:
+        # 每个 db3 文件相互独立，在各自的进程中同步；输出按文件顺序打印
+        from concurrent.futures import ProcessPoolExecutor
+        
+        results = []
+        sync = partial(sync_database_captured, project_root=project_root, snapshot=args.snapshot)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for success, output in executor.map(sync, db_files):
+                print(output, end='')
+                results.append(success)
+    
+    success_count = sum(results)
     
     print(f"\n{'='*60}")
     print(f"同步完成: {success_count}/{len(db_files)} 个数据库同步成功")